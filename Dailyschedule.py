@@ -1,12 +1,12 @@
 import streamlit as st
 import pandas as pd
-import csv
+import re
+from bisect import bisect_right
+from functools import lru_cache
 from datetime import datetime, time, date, timedelta
-import pytz
-import subprocess
-import sys
-import os
-import pymongo
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 
 # --- CONFIGURATION ---
 st.set_page_config(
@@ -17,19 +17,39 @@ st.set_page_config(
 )
 
 # --- CONSTANTS ---
-SCRAPED_DATA_PATH = "latest_forex_data.csv"
 DB_NAME = "DailyTradingPlanner"
 COLLECTION_NAME = "economic_events"
+# Only the fields the plan analysis and event list read
+EVENT_COLUMNS = ['date_iso', 'time_minutes', 'currency', 'impact', 'event']
+EVENT_PROJECTION = {'_id': 0, **dict.fromkeys(EVENT_COLUMNS, 1)}
 
 # --- MORNING_CUTOFF and other constants ---
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
 MORNING_CUTOFF = time(12, 0)
 AFTERNOON_NO_TRADE_START = time(13, 55)
+# Same cutoffs as minute-of-day, compared against the time_minutes stored at ingest
+MORNING_CUTOFF_MINUTES = MORNING_CUTOFF.hour * 60 + MORNING_CUTOFF.minute
+AFTERNOON_NO_TRADE_START_MINUTES = AFTERNOON_NO_TRADE_START.hour * 60 + AFTERNOON_NO_TRADE_START.minute
 NO_TRADE_KEYWORDS = ['FOMC Statement', 'FOMC Press Conference', 'Interest Rate Decision', 'Monetary Policy Report']
 FORCED_HIGH_IMPACT_KEYWORDS = ['Powell Speaks', 'Fed Chair', 'Non-Farm', 'NFP', 'CPI', 'Consumer Price Index', 'PPI', 'Producer Price Index', 'GDP']
 WIN_STREAK_THRESHOLD = 5
 
+# Case-insensitive alternations, compiled once instead of scanning each keyword per event
+NO_TRADE_RE = re.compile('|'.join(map(re.escape, NO_TRADE_KEYWORDS)), re.IGNORECASE)
+FORCED_HIGH_IMPACT_RE = re.compile('|'.join(map(re.escape, FORCED_HIGH_IMPACT_KEYWORDS)), re.IGNORECASE)
+
+# --- PARSING FORMATS (scraper output first, so the hot path never raises) ---
+ISO_DATE_FORMAT = '%Y-%m-%d'
+DATE_FORMATS = ('%d/%m/%Y', ISO_DATE_FORMAT)
+TIME_FORMATS = ('%I:%M%p', '%I:%M %p', '%H:%M')
+_DATE_FMT_CACHE = [None]  # last format that parsed successfully
+
 # --- ENHANCED CSS STYLES ---
-st.markdown("""
+@st.cache_resource
+def load_css():
+    return """
 <style>
     /* Base styling */
     .stApp { background: linear-gradient(135deg, #0f1419 0%, #1a1f2e 100%); }
@@ -73,172 +93,278 @@ st.markdown("""
     h2 { color: #e2e8f0; margin-bottom: 1rem; }
     h3 { color: #cbd5e1; }
     .weekend-notice { background: linear-gradient(135deg, rgba(99, 102, 241, 0.2), rgba(67, 56, 202, 0.1)); border: 2px solid #6366f1; border-radius: 16px; padding: 2rem; text-align: center; color: #c7d2fe; }
+    .key-events { margin: 0 0 0.75rem 0; padding: 0.5rem 1rem; border: 1px solid rgba(255, 255, 255, 0.1); border-radius: 8px; background: rgba(255, 255, 255, 0.03); }
+    .key-events summary { cursor: pointer; font-weight: 600; color: #cbd5e1; }
+    .key-event { padding: 0.35rem 0; }
     .pill { padding: 4px 10px; border-radius: 999px; font-weight: 700; font-size: 12px; display: inline-block; }
     .pill-ok { background: rgba(16,185,129,.15); border:1px solid rgba(16,185,129,.4); color:#a7f3d0; }
     .pill-warn { background: rgba(245,158,11,.15); border:1px solid rgba(245,158,11,.4); color:#fde68a; }
     .pill-bad { background: rgba(239,68,68,.15); border:1px solid rgba(239,68,68,.4); color:#fecaca; }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # --- DATABASE AND UTILITY FUNCTIONS ---
 @st.cache_resource
 def init_connection():
+    # Imported lazily so a cold start doesn't pay for the driver before first paint
+    import pymongo
     try:
         connection_string = st.secrets["mongo"]["connection_string"]
-        client = pymongo.MongoClient(connection_string)
-        return client
+        # Warm pool reused across reruns; fail fast instead of hanging the page on a bad host
+        client = pymongo.MongoClient(
+            connection_string,
+            maxPoolSize=20,
+            minPoolSize=2,
+            serverSelectionTimeoutMS=3000,
+            socketTimeoutMS=5000,
+            compressors='zlib',
+            retryReads=True,
+        )
     except (KeyError, pymongo.errors.ConfigurationError) as e:
         st.error(f"Failed to connect to MongoDB. Please check your secrets.toml file. Error: {e}")
         return None
+    # Pay server selection once here rather than on the first real query
+    try:
+        client.admin.command('ping')
+    except pymongo.errors.PyMongoError:
+        # Re-raise rather than return None so the dead client isn't cached and the next rerun retries
+        client.close()
+        raise
+    return client
 
-@st.cache_data(ttl=600)
-def get_events_from_db():
-    client = init_connection()
-    if client is None:
-        return pd.DataFrame()
-    db = client[DB_NAME]
-    collection = db[COLLECTION_NAME]
-    items = list(collection.find({}, {'_id': 0}))
-    if not items:
-        st.info("Database is currently empty. Please fetch live economic data.")
-        return pd.DataFrame()
-    return pd.DataFrame(items)
-
-def update_db_from_csv(file_path):
+@st.cache_resource
+def get_collection():
+    """Events collection handle shared across reruns, or None without a client."""
     client = init_connection()
     if client is None:
-        return 0, 0
-    db = client[DB_NAME]
-    collection = db[COLLECTION_NAME]
+        return None
+    return client[DB_NAME][COLLECTION_NAME]
+
+def to_date_iso(date_str):
+    parsed = parse_date(date_str)
+    return parsed.isoformat() if parsed else None
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute if t else None
+
+# Called once per run from main rather than inside get_collection, so its warning isn't replayed at every cached call site
+@st.cache_resource(show_spinner=False)
+def prepare_collection():
+    """Index date_iso and backfill the derived fields on documents stored before they existed."""
+    from pymongo import UpdateOne
+    from pymongo.errors import OperationFailure
+    collection = get_collection()
+    if collection is None:
+        return
+    # date_iso is always set, even to null for unparseable dates, so those aren't rescanned on every start
+    stale = {'$or': [{'date_iso': {'$exists': False}}, {'time_minutes': {'$exists': False}}]}
     try:
-        df = pd.read_csv(file_path)
-        events = df.to_dict('records')
-    except FileNotFoundError:
-        st.error(f"Scraped data file not found at: {file_path}")
-        return 0, 0
-    upserted_count = 0
-    modified_count = 0
+        # Serves both the week range filter and the chronological sort in get_events_window
+        collection.create_index([('date_iso', 1), ('time_minutes', 1)])
+        # Upserts match on this key; without an index each one scans the collection
+        collection.create_index([('date', 1), ('time', 1), ('event', 1), ('currency', 1)])
+        operations = [
+            UpdateOne({'_id': doc['_id']}, {'$set': {
+                'date_iso': to_date_iso(doc.get('date', '')),
+                'time_minutes': to_minutes(parse_time(doc.get('time', ''))),
+            }})
+            for doc in collection.find(stale, {'date': 1, 'time': 1})
+        ]
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+    except OperationFailure as e:
+        # Reads only match on date_iso, so un-backfilled events would silently drop out of every plan
+        if collection.find_one(stale, {'_id': 1}) is not None:
+            st.error(f"❌ Some stored events could not be backfilled without write access, so plans may leave them out and are not reliable. Error: {e}")
+        else:
+            # Nothing left to backfill, so read-only credentials only cost the indexes
+            st.warning(f"Could not create indexes on the events collection, continuing read-only. Error: {e}")
+
+@st.cache_data(ttl=300, show_spinner=False)
+def db_has_events():
+    collection = get_collection()
+    if collection is None:
+        return False
+    if collection.find_one({}, {'_id': 1}) is None:
+        st.info("Database is currently empty. Please fetch live economic data.")
+        return False
+    return True
+
+# In-memory only: disk persistence ignores ttl, so writes that bypass .clear() would never show up
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def get_events_window(start_iso, end_iso):
+    """Classified events for every day in [start_iso, end_iso], keyed by date_iso."""
+    collection = get_collection()
+    if collection is None:
+        return {}
+    # ISO date strings sort chronologically, so one index serves both the range and the ordering
+    cursor = collection.find({'date_iso': {'$gte': start_iso, '$lte': end_iso}}, EVENT_PROJECTION)
+    items = list(cursor.sort([('date_iso', 1), ('time_minutes', 1)]))
+    if not items:
+        return {}
+    # Classify inside the cached call so reruns reuse the derived columns too
+    df = classify_events(pd.DataFrame.from_records(items, columns=EVENT_COLUMNS))
+    return {day: day_df.reset_index(drop=True) for day, day_df in df.groupby('date_iso', sort=False)}
+
+def upsert_events(collection, events):
+    """Upsert scraped rows keyed on date/time/event/currency; returns (upserted, modified)."""
+    from pymongo import UpdateOne
+    operations = []
     for event in events:
+        event['date_iso'] = to_date_iso(event.get('date', ''))
+        event['time_minutes'] = to_minutes(parse_time(event.get('time', '')))
         query = {
             'date': event.get('date'),
             'time': event.get('time'),
             'event': event.get('event'),
             'currency': event.get('currency')
         }
-        result = collection.update_one(query, {"$set": event}, upsert=True)
-        if result.upserted_id:
-            upserted_count += 1
-        elif result.modified_count > 0:
-            modified_count += 1
-    return upserted_count, modified_count
+        operations.append(UpdateOne(query, {"$set": event}, upsert=True))
+    if not operations:
+        return 0, 0
+    # One unordered batch instead of a round-trip per row
+    result = collection.bulk_write(operations, ordered=False)
+    return result.upserted_count, result.modified_count
 
 # --- TIME/DATE HELPERS ---
 def get_current_market_time():
-    et = pytz.timezone('US/Eastern')
-    return datetime.now(et)
+    return datetime.now(MARKET_TZ)
 
 def time_until_market_open():
-    et = pytz.timezone('US/Eastern')
-    now = datetime.now(et)
-    market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
-    if now.time() > time(16, 0):
+    now = datetime.now(MARKET_TZ)
+    market_open = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if now.time() > MARKET_CLOSE:
         market_open += timedelta(days=1)
     if now.weekday() >= 5:
         market_open += timedelta(days=7 - now.weekday())
     return market_open - now
 
+@lru_cache(maxsize=4096)
 def parse_time(time_str):
     if not time_str or pd.isna(time_str) or str(time_str).lower() in ['empty', '']:
         return None
-    for fmt in ('%I:%M%p', '%I:%M %p', '%H:%M'):
+    for fmt in TIME_FORMATS:
         try:
             return datetime.strptime(str(time_str).strip(), fmt).time()
         except ValueError:
             continue
     return None
 
+def _parse_date_with(date_str, fmt):
+    if fmt == ISO_DATE_FORMAT:
+        return date.fromisoformat(date_str)
+    return datetime.strptime(date_str, fmt).date()
+
+@lru_cache(maxsize=4096)
 def parse_date(date_str):
-    try:
-        return datetime.strptime(str(date_str).strip(), '%d/%m/%Y').date()
-    except (ValueError, TypeError):
-        return None
+    date_str = str(date_str).strip()
+    cached_fmt = _DATE_FMT_CACHE[0]
+    if cached_fmt:
+        try:
+            return _parse_date_with(date_str, cached_fmt)
+        except (ValueError, TypeError):
+            pass
+    for fmt in DATE_FORMATS:
+        if fmt == cached_fmt:
+            continue
+        try:
+            parsed = _parse_date_with(date_str, fmt)
+        except (ValueError, TypeError):
+            continue
+        _DATE_FMT_CACHE[0] = fmt
+        return parsed
+    return None
 
-def parse_impact(impact_str):
-    if not impact_str or pd.isna(impact_str):
-        return "Low"
-    lower = str(impact_str).lower()
-    if 'high' in lower:
-        return "High"
-    if 'medium' in lower:
-        return "Medium"
-    if 'low' in lower:
-        return "Low"
-    return "Low"
+def classify_events(df):
+    """Adds the parsed/classified columns analyze_day_events reads, computed column-wise."""
+    names = df['event'].fillna('').astype(str)
+    impacts = df['impact'].fillna('').astype(str).str.lower()
+    # time_minutes comes back as float with NaN for all-day rows; turn it into int/None
+    minutes = df['time_minutes'].astype('Int64')
+    df['time_minutes'] = minutes.astype(object).where(minutes.notna(), None)
+    df['parsed_time'] = df['time_minutes'].map(lambda m: None if m is None else time(m // 60, m % 60))
+    df['parsed_impact'] = (
+        pd.Series("Low", index=df.index)
+        .mask(impacts.str.contains('medium', regex=False), "Medium")
+        .mask(impacts.str.contains('high', regex=False), "High")
+    )
+    df['time_display'] = df['parsed_time'].map(lambda t: t.strftime('%I:%M %p') if t else 'All Day')
+    df['currency'] = df['currency'].fillna('').astype(str).str.strip().str.upper()
+    df['is_forced_high'] = names.str.contains(FORCED_HIGH_IMPACT_RE)
+    df['is_no_trade'] = names.str.contains(NO_TRADE_RE)
+    df['is_high_impact'] = df['is_forced_high'] | (df['parsed_impact'] == "High")
+    df['display_impact'] = df['parsed_impact'].mask(df['is_forced_high'] & (df['parsed_impact'] != "High"), "High (Forced)")
+    # Plan triggers and session buckets for the whole window in one pass; analyze_day_events only slices by them
+    is_usd = df['currency'].eq('USD')
+    df['is_timed'] = minutes.notna()
+    df['is_morning'] = minutes.lt(MORNING_CUTOFF_MINUTES).fillna(False).astype(bool)
+    df['is_usd_high'] = is_usd & df['is_high_impact']
+    df['is_usd_high_timed'] = df['is_usd_high'] & df['is_timed']
+    df['is_no_trade_trigger'] = is_usd & df['is_no_trade'] & minutes.ge(AFTERNOON_NO_TRADE_START_MINUTES).fillna(False).astype(bool)
+    # Low-cardinality labels: categories keep the cached frames small and make .eq() a code compare
+    for col in ('currency', 'parsed_impact', 'display_impact'):
+        df[col] = df[col].astype('category')
+    return df
 
 # --- CALENDAR ANALYSIS ---
-def analyze_day_events(target_date, events):
+EVENT_DETAIL_COLUMNS = {
+    'event': 'name',
+    'currency': 'currency',
+    'display_impact': 'impact',
+    'time_display': 'time',
+}
+
+def analyze_day_events(target_date, events_df, need_events=True):
+    """Plan, reason and the day's event buckets; buckets are None when need_events is False."""
     plan = "Standard Day Plan"
     reason = "No high-impact USD news found. Proceed with the Standard Day Plan and your directional bias."
-    has_high_impact_usd_event = False
-    morning_events, afternoon_events, all_day_events = [], [], []
 
-    for event in events:
-        event_time = parse_time(event.get('time', ''))
-        event_name = event.get('event', '')
-        currency = event.get('currency', '').strip().upper()
-        parsed_impact = parse_impact(event.get('impact', ''))
-        is_forced_high = any(keyword.lower() in event_name.lower() for keyword in FORCED_HIGH_IMPACT_KEYWORDS)
-        is_high_impact = (parsed_impact == 'High') or is_forced_high
-        display_impact = "High (Forced)" if is_forced_high and parsed_impact != 'High' else ("High" if is_high_impact else parsed_impact)
-
-        event_details = {
-            'name': event_name,
-            'currency': currency,
-            'impact': display_impact,
-            'time': event_time.strftime('%I:%M %p') if event_time else 'All Day',
-            'raw_time': event_time
-        }
+    no_trade_mask = events_df['is_no_trade_trigger']
 
-        if event_time is None:
-            all_day_events.append(event_details)
-        elif event_time < MORNING_CUTOFF:
-            morning_events.append(event_details)
-        else:
-            afternoon_events.append(event_details)
-
-        if currency == 'USD':
-            if any(keyword.lower() in event_name.lower() for keyword in NO_TRADE_KEYWORDS):
-                if event_time and event_time >= AFTERNOON_NO_TRADE_START:
-                    return (
-                        "No Trade Day",
-                        f"Critical afternoon USD event '{event_name}' at {event_time.strftime('%I:%M %p')}. Capital preservation is the priority.",
-                        morning_events, afternoon_events, all_day_events
-                    )
-            if is_high_impact and event_time:
-                has_high_impact_usd_event = True
-
-    if has_high_impact_usd_event:
+    if no_trade_mask.any():
+        no_trade_event = events_df[no_trade_mask].iloc[0]
+        plan = "No Trade Day"
+        reason = f"Critical afternoon USD event '{no_trade_event['event']}' at {no_trade_event['time_display']}. Capital preservation is the priority."
+    elif events_df['is_usd_high_timed'].any():
         plan = "News Day Plan"
         reason = "High-impact USD news detected. The News Day Plan is active. Be patient and wait for the news-driven liquidity sweep."
 
-    return plan, reason, morning_events, afternoon_events, all_day_events
+    # Returned so the week view lists key events without re-masking the day
+    key_usd_events = events_df.loc[events_df['is_usd_high'], list(EVENT_DETAIL_COLUMNS)].rename(columns=EVENT_DETAIL_COLUMNS)
+    if not need_events:
+        # The week view only shows plan cards and key events; skip slicing the buckets
+        return plan, reason, None, None, None, key_usd_events
+
+    details = events_df[list(EVENT_DETAIL_COLUMNS)].rename(columns=EVENT_DETAIL_COLUMNS)
+    is_timed, is_morning = events_df['is_timed'], events_df['is_morning']
+    morning_events = details[is_morning]
+    afternoon_events = details[is_timed & ~is_morning]
+    all_day_events = details[~is_timed]
+
+    return plan, reason, morning_events, afternoon_events, all_day_events, key_usd_events
 
 # --- SESSION HELPER ---
+# Each boundary starts the session paired with it; anything before the first is Pre-Market
+SESSION_BOUNDARIES = (
+    (time(2, 0), "London"),
+    (time(5, 0), "Pre-Market"),
+    (MARKET_OPEN, "NY Morning"),
+    (MORNING_CUTOFF, "NY Lunch"),
+    (time(13, 30), "NY Afternoon"),
+    (MARKET_CLOSE, "Pre-Market"),
+)
+SESSION_STARTS = [start for start, _ in SESSION_BOUNDARIES]
+
 def get_current_session(current_time):
-    current = current_time.time()
-    if time(2, 0) <= current < time(5, 0):
-        return "London"
-    elif time(9, 30) <= current < time(12, 0):
-        return "NY Morning"
-    elif time(12, 0) <= current < time(13, 30):
-        return "NY Lunch"
-    elif time(13, 30) <= current < time(16, 0):
-        return "NY Afternoon"
-    else:
-        return "Pre-Market"
+    index = bisect_right(SESSION_STARTS, current_time.time())
+    return SESSION_BOUNDARIES[index - 1][1] if index else "Pre-Market"
 
 # --- UI COMPONENTS ---
 
+# Clock cards tick on their own each minute without rerunning the rest of the page
+@st.fragment(run_every=60)
 def display_header_dashboard():
     current_time = get_current_market_time()
     time_to_open = time_until_market_open()
@@ -263,7 +389,7 @@ def display_header_dashboard():
             display = f"{hours}h {mins}m"
             label = "Time to Open"
         else:
-            display = "OPEN" if current_time.time() < time(16, 0) else "CLOSED"
+            display = "OPEN" if current_time.time() < MARKET_CLOSE else "CLOSED"
             label = "Market Status"
         st.markdown(f'''
         <div class="info-card">
@@ -345,13 +471,14 @@ def display_risk_management():
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+PLAN_STYLES = {
+    "No Trade Day": ("no-trade", "🚫", "NO TRADE DAY"),
+    "News Day Plan": ("news-day", "📰", "NEWS DAY PLAN"),
+    "Standard Day Plan": ("standard-day", "✅", "STANDARD DAY PLAN"),
+}
+
 def display_main_plan_card(plan, reason):
-    if plan == "No Trade Day":
-        card_class, icon, title = "no-trade", "🚫", "NO TRADE DAY"
-    elif plan == "News Day Plan":
-        card_class, icon, title = "news-day", "📰", "NEWS DAY PLAN"
-    else:
-        card_class, icon, title = "standard-day", "✅", "STANDARD DAY PLAN"
+    card_class, icon, title = PLAN_STYLES.get(plan, PLAN_STYLES["Standard Day Plan"])
 
     st.markdown(f'''
     <div class="main-plan-card {card_class}">
@@ -362,110 +489,112 @@ def display_main_plan_card(plan, reason):
     ''', unsafe_allow_html=True)
 
 
+IMPACT_CLASSES = {
+    "High": "event-high",
+    "High (Forced)": "event-high",
+    "Medium": "event-medium",
+    "Low": "event-low",
+}
+
+def compact_events_html(events):
+    html_parts = []
+    for event in events.itertuples(index=False):
+        impact_class = IMPACT_CLASSES.get(event.impact, "event-low")
+        currency_class = "usd" if event.currency == 'USD' else ""
+        html_parts.append(f'''
+        <div class="event-compact {impact_class}">
+            <div class="event-time">{event.time}</div>
+            <div class="event-currency {currency_class}">{event.currency}</div>
+            <div style="flex: 1; margin-left: 15px;">{event.name}</div>
+        </div>
+        ''')
+    return ''.join(html_parts)
+
 def display_compact_events(morning_events, afternoon_events, all_day_events):
-    if not any([morning_events, afternoon_events, all_day_events]):
+    if morning_events.empty and afternoon_events.empty and all_day_events.empty:
         st.info("📅 No economic events scheduled for today.")
         return
 
-    tabs = st.tabs(["🌅 Morning", "🌇 Afternoon", "📅 All Day"] if all_day_events else ["🌅 Morning", "🌇 Afternoon"])
+    tabs = st.tabs(["🌅 Morning", "🌇 Afternoon", "📅 All Day"] if not all_day_events.empty else ["🌅 Morning", "🌇 Afternoon"])
 
+    # One markdown per tab: each st.markdown call is a separate delta sent to the browser
     with tabs[0]:
-        if morning_events:
-            for event in sorted([e for e in morning_events if e['raw_time']], key=lambda x: x['raw_time']):
-                impact_class = "event-high" if "High" in event['impact'] else ("event-medium" if "Medium" in event['impact'] else "event-low")
-                currency_class = "usd" if event['currency'] == 'USD' else ""
-                st.markdown(f'''
-                <div class="event-compact {impact_class}">
-                    <div class="event-time">{event["time"]}</div>
-                    <div class="event-currency {currency_class}">{event["currency"]}</div>
-                    <div style="flex: 1; margin-left: 15px;">{event["name"]}</div>
-                </div>
-                ''', unsafe_allow_html=True)
+        if not morning_events.empty:
+            st.markdown(compact_events_html(morning_events), unsafe_allow_html=True)
         else:
             st.markdown("*No morning events*")
 
     with tabs[1]:
-        if afternoon_events:
-            for event in sorted([e for e in afternoon_events if e['raw_time']], key=lambda x: x['raw_time']):
-                impact_class = "event-high" if "High" in event['impact'] else ("event-medium" if "Medium" in event['impact'] else "event-low")
-                currency_class = "usd" if event['currency'] == 'USD' else ""
-                st.markdown(f'''
-                <div class="event-compact {impact_class}">
-                    <div class="event-time">{event["time"]}</div>
-                    <div class="event-currency {currency_class}">{event["currency"]}</div>
-                    <div style="flex: 1; margin-left: 15px;">{event["name"]}</div>
-                </div>
-                ''', unsafe_allow_html=True)
+        if not afternoon_events.empty:
+            st.markdown(compact_events_html(afternoon_events), unsafe_allow_html=True)
         else:
             st.markdown("*No afternoon events*")
 
-    if all_day_events and len(tabs) > 2:
+    if not all_day_events.empty and len(tabs) > 2:
         with tabs[2]:
-            for event in all_day_events:
-                impact_class = "event-high" if "High" in event['impact'] else ("event-medium" if "Medium" in event['impact'] else "event-low")
-                currency_class = "usd" if event['currency'] == 'USD' else ""
-                st.markdown(f'''
-                <div class="event-compact {impact_class}">
-                    <div class="event-time">All Day</div>
-                    <div class="event-currency {currency_class}">{event["currency"]}</div>
-                    <div style="flex: 1; margin-left: 15px;">{event["name"]}</div>
-                </div>
-                ''', unsafe_allow_html=True)
+            st.markdown(compact_events_html(all_day_events), unsafe_allow_html=True)
+
+
+ACTION_ITEMS = {
+    "News Day Plan": [
+        ("🚫", "DO NOT trade the morning session"),
+        ("📊", "Mark NY Lunch Range (12:00 PM - 1:30 PM)"),
+        ("👀", "Wait for liquidity raid after news"),
+        ("🎯", "Prime entry: 2:00 PM - 3:00 PM"),
+        ("✅", "Enter on MSS + FVG confirmation"),
+    ],
+    "Standard Day Plan": [
+        ("📈", "Mark Previous Day PM Range"),
+        ("🌍", "Mark London Session Range"),
+        ("👀", "Watch NY Open Judas Swing (9:30-10:30)"),
+        ("🎯", "Prime entry: 10:00 AM - 11:00 AM"),
+        ("✅", "Enter after sweep with MSS + FVG"),
+    ],
+    "No Trade Day": [
+        ("🚫", "Stand aside completely"),
+        ("💰", "Preserve capital"),
+        ("📚", "Journal and review"),
+        ("🧘", "Prepare for next trading day"),
+    ],
+}
+
+# The checklist only depends on the plan, so its HTML is built once at import
+ACTION_CHECKLIST_HTML = {
+    plan: ''.join(
+        f'<div class="action-item"><div class="action-emoji">{emoji}</div><div>{text}</div></div>'
+        for emoji, text in actions
+    )
+    for plan, actions in ACTION_ITEMS.items()
+}
 
 
 def display_action_checklist(plan):
     st.markdown('<div class="action-section">', unsafe_allow_html=True)
     st.markdown("### 🎯 Action Items")
+    st.markdown(ACTION_CHECKLIST_HTML.get(plan, ACTION_CHECKLIST_HTML["No Trade Day"]), unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
 
-    if plan == "News Day Plan":
-        actions = [
-            ("🚫", "DO NOT trade the morning session"),
-            ("📊", "Mark NY Lunch Range (12:00 PM - 1:30 PM)"),
-            ("👀", "Wait for liquidity raid after news"),
-            ("🎯", "Prime entry: 2:00 PM - 3:00 PM"),
-            ("✅", "Enter on MSS + FVG confirmation"),
-        ]
-    elif plan == "Standard Day Plan":
-        actions = [
-            ("📈", "Mark Previous Day PM Range"),
-            ("🌍", "Mark London Session Range"),
-            ("👀", "Watch NY Open Judas Swing (9:30-10:30)"),
-            ("🎯", "Prime entry: 10:00 AM - 11:00 AM"),
-            ("✅", "Enter after sweep with MSS + FVG"),
-        ]
-    else:
-        actions = [
-            ("🚫", "Stand aside completely"),
-            ("💰", "Preserve capital"),
-            ("📚", "Journal and review"),
-            ("🧘", "Prepare for next trading day"),
-        ]
-
-    for emoji, text in actions:
-        st.markdown(f'''
-        <div class="action-item">
-            <div class="action-emoji">{emoji}</div>
-            <div>{text}</div>
-        </div>
-        ''', unsafe_allow_html=True)
 
-    st.markdown('</div>', unsafe_allow_html=True)
+TGIF_PRECONDITIONS_MD = "\n\n".join([
+    "**Pre-conditions:**",
+    "✓ Strong weekly trend established",
+    "✓ Higher timeframe level hit (premium/discount array)",
+])
 
+TGIF_PLAN_ALERTS = {
+    "Standard Day Plan": ("success", "**Perfect alignment:** Watch for morning Judas swing peak (9:30-10:30 AM) then target 20-30% weekly retracement."),
+    "News Day Plan": ("warning", "**Adjusted timing:** Look for afternoon peak formation (1:30-2:00 PM) after news releases."),
+    "No Trade Day": ("error", "**Observe only:** No trading today due to high-risk environment."),
+}
 
 def display_friday_alert(plan):
     if date.today().weekday() != 4:
         return
     with st.expander("🎯 T.G.I.F. Setup Alert", expanded=False):
         st.info("Friday T.G.I.F. Setup might be in play - retracement back into weekly range.")
-        st.markdown("**Pre-conditions:**")
-        st.markdown("✓ Strong weekly trend established")
-        st.markdown("✓ Higher timeframe level hit (premium/discount array)")
-        if plan == "Standard Day Plan":
-            st.success("**Perfect alignment:** Watch for morning Judas swing peak (9:30-10:30 AM) then target 20-30% weekly retracement.")
-        elif plan == "News Day Plan":
-            st.warning("**Adjusted timing:** Look for afternoon peak formation (1:30-2:00 PM) after news releases.")
-        else:
-            st.error("**Observe only:** No trading today due to high-risk environment.")
+        st.markdown(TGIF_PRECONDITIONS_MD)
+        kind, message = TGIF_PLAN_ALERTS.get(plan, TGIF_PLAN_ALERTS["No Trade Day"])
+        getattr(st, kind)(message)
 
 # =========================
 # NEW: PAYOUT & GROWTH MODULE
@@ -651,6 +780,65 @@ def payout_and_growth_ui():
             months = int((remaining + monthly_goal_flow - 1) // monthly_goal_flow)
             st.write(f"At **${monthly_goal_flow:,.0f}/month** to the trip fund, you would reach **${goal_min:,.0f}** in about **{months} month(s)** (ignoring compounding and variability).")
 
+# --- LIVE DATA FETCH ---
+@st.cache_resource
+def scraper_executor():
+    """Single process-wide worker: fetches never block a page and never drive Chrome concurrently."""
+    return ThreadPoolExecutor(max_workers=1)
+
+@st.cache_resource
+def fetch_job():
+    """Process-wide handle on the running fetch, so a reloaded tab sees it and can't queue a duplicate."""
+    return {'lock': Lock(), 'future': None, 'progress': []}
+
+def run_fetch(scrape, collection, progress):
+    """Scrape, upsert and clear the caches in one worker job; returns the (kind, message) notice to show."""
+    # Checked before scraping so a misconfigured deploy doesn't start Chrome for nothing
+    if collection is None:
+        return ("error", "❌ Update failed: no database connection. Please check your secrets.toml file.")
+    events = scrape(progress=progress)
+    if not events:
+        return ("info", "ℹ️ Scraper returned no new data. Database is already up to date.")
+    # Upsert the scraped rows directly, skipping the CSV round-trip
+    upserted, modified = upsert_events(collection, events)
+    # Every session's cached reads go stale at once, including an earlier 'database empty' answer
+    db_has_events.clear()
+    get_events_window.clear()
+    return ("success", f"✅ Updated! {upserted} new, {modified} modified")
+
+def start_fetch():
+    try:
+        # Imported here so selenium only loads when a fetch is actually requested
+        import ffscraper
+        # Resolved on the script thread; the worker has no Streamlit context to report connection errors in
+        collection = get_collection()
+        job = fetch_job()
+        with job['lock']:
+            if job['future'] is None or job['future'].done():
+                # The worker appends stage messages here; poll_fetch replays them while the job runs
+                job['progress'] = []
+                job['future'] = scraper_executor().submit(run_fetch, ffscraper.scrape, collection, job['progress'].append)
+            st.session_state.scrape_future = job['future']
+    except Exception as e:
+        st.session_state.fetch_notice = ("error", f"❌ Update failed: {str(e)}")
+
+@st.fragment(run_every=2)
+def poll_fetch():
+    future = st.session_state.get('scrape_future')
+    if future is None:
+        return
+    if not future.done():
+        with st.status("⏳ Fetching live data in the background...", expanded=True):
+            for message in fetch_job()['progress']:
+                st.write(message)
+        return
+    del st.session_state.scrape_future
+    try:
+        st.session_state.fetch_notice = future.result()
+    except Exception as e:
+        st.session_state.fetch_notice = ("error", f"❌ Update failed: {str(e)}")
+    st.rerun()
+
 # --- MAIN APPLICATION ---
 
 def main():
@@ -659,17 +847,20 @@ def main():
     # Header dashboard
     display_header_dashboard()
 
-    # Data fetch button
-    if st.button("🔄 Fetch Live Data", type="primary"):
-        with st.spinner("Fetching data..."):
-            try:
-                result = subprocess.run([sys.executable, "ffscraper.py"], capture_output=True, check=True, text=True)
-                upserted, modified = update_db_from_csv(SCRAPED_DATA_PATH)
-                st.success(f"✅ Updated! {upserted} new, {modified} modified")
-                st.cache_data.clear()
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Update failed: {str(e)}")
+    # Data fetch button; the scrape runs in the background so the page stays usable
+    running = fetch_job()['future']
+    if 'scrape_future' not in st.session_state and running is not None and not running.done():
+        # Pick up a fetch started before this tab was reloaded instead of offering a second one
+        st.session_state.scrape_future = running
+    fetch_pending = 'scrape_future' in st.session_state
+    if st.button("🔄 Fetch Live Data", type="primary", disabled=fetch_pending):
+        start_fetch()
+        fetch_pending = 'scrape_future' in st.session_state
+    if fetch_pending:
+        poll_fetch()
+    if 'fetch_notice' in st.session_state:
+        kind, message = st.session_state.pop('fetch_notice')
+        getattr(st, kind)(message)
 
     # Date selection and view mode
     col1, col2, col3 = st.columns([2, 1, 1])
@@ -699,27 +890,35 @@ def main():
         return
 
     # Get data
-    df = get_events_from_db()
-    if df.empty:
-        st.warning("👋 No economic data found. Click **Fetch Live Data** to load current events.")
+    from pymongo.errors import PyMongoError
+    try:
+        prepare_collection()
+        has_events = db_has_events()
+    except PyMongoError as e:
+        st.error(f"❌ Could not reach MongoDB: {e}")
+        has_events = None
+    if not has_events:
+        if has_events is not None:
+            st.warning("👋 No economic data found. Click **Fetch Live Data** to load current events.")
         if show_payout:
             st.markdown("\n")
             payout_and_growth_ui()
         return
 
-    records = df.to_dict('records')
-
-    def get_events_for(d):
-        return [row for row in records if parse_date(row.get('date', '')) == d]
+    # One query covers the selected week; both views and date flips within it slice this dict
+    start_of_week = selected_date - timedelta(days=selected_date.weekday())
+    week_start_iso, week_end_iso = start_of_week.isoformat(), (start_of_week + timedelta(days=4)).isoformat()
+    week_events = get_events_window(week_start_iso, week_end_iso)
+    no_events = pd.DataFrame()
 
     if view_mode == "Today":
         display_risk_management()
-        events = get_events_for(selected_date)
-        if not events:
+        events = week_events.get(selected_date.isoformat(), no_events)
+        if events.empty:
             plan, reason = "Standard Day Plan", "No economic events found. Proceed with Standard Day Plan."
-            morning, afternoon, allday = [], [], []
+            morning = afternoon = allday = pd.DataFrame(columns=list(EVENT_DETAIL_COLUMNS.values()))
         else:
-            plan, reason, morning, afternoon, allday = analyze_day_events(selected_date, events)
+            plan, reason, morning, afternoon, allday, _ = analyze_day_events(selected_date, events)
 
         display_main_plan_card(plan, reason)
         display_friday_alert(plan)
@@ -737,48 +936,41 @@ def main():
 
     else:  # Week view
         st.markdown("## 🗓 Weekly Trading Outlook")
-        start_of_week = selected_date - timedelta(days=selected_date.weekday())
+        # Whole outlook goes out as one markdown; key events use <details> instead of st.expander
+        week_html = []
         for i in range(5):
             d = start_of_week + timedelta(days=i)
-            events_for_day = get_events_for(d)
-            if not events_for_day:
+            events_for_day = week_events.get(d.isoformat(), no_events)
+            if events_for_day.empty:
                 plan, reason = "Standard Day Plan", "No economic events."
+                key_usd_events = no_events
             else:
-                plan, reason, *_ = analyze_day_events(d, events_for_day)
+                plan, reason, *_, key_usd_events = analyze_day_events(d, events_for_day, need_events=False)
 
-            if plan == "No Trade Day":
-                card_class, icon = "no-trade", "🚫"
-            elif plan == "News Day Plan":
-                card_class, icon = "news-day", "📰"
-            else:
-                card_class, icon = "standard-day", "✅"
+            card_class, icon, _ = PLAN_STYLES.get(plan, PLAN_STYLES["Standard Day Plan"])
 
             is_today = d == date.today()
             border_style = "border: 3px solid #3b82f6;" if is_today else ""
 
-            st.markdown(f'''
+            week_html.append(f'''
             <div class="main-plan-card {card_class}" style="grid-column: span 1; padding: 1rem; margin: 0.5rem 0; {border_style}">
                 <h3 style="margin: 0;">{icon} {d.strftime('%A, %b %d')}</h3>
                 <h4 style="margin: 0.5rem 0;">{plan}</h4>
                 <p style="margin: 0.5rem 0 0 0; font-size: 0.9rem;">{reason}</p>
                 {"<small style='color: #3b82f6; font-weight: bold;'>← TODAY</small>" if is_today else ""}
             </div>
-            ''', unsafe_allow_html=True)
-
-            if events_for_day:
-                high_impact_usd = [
-                    e for e in events_for_day
-                    if e.get('currency', '').upper() == 'USD' and (
-                        parse_impact(e.get('impact', '')) == 'High' or
-                        any(keyword.lower() in e.get('event', '').lower() for keyword in FORCED_HIGH_IMPACT_KEYWORDS)
-                    )
-                ]
-                if high_impact_usd:
-                    with st.expander(f"Key Events - {d.strftime('%A')}", expanded=False):
-                        for event in high_impact_usd[:3]:
-                            event_time = parse_time(event.get('time', ''))
-                            time_display = event_time.strftime('%I:%M %p') if event_time else 'All Day'
-                            st.markdown(f"🔴 **{time_display}** - {event.get('event', '')}")
+            ''')
+
+            if not key_usd_events.empty:
+                key_items = ''.join(
+                    f'<div class="key-event">🔴 <strong>{event.time}</strong> - {event.name}</div>'
+                    for event in key_usd_events.head(3).itertuples()
+                )
+                week_html.append(f'''
+            <details class="key-events"><summary>Key Events - {d.strftime('%A')}</summary>{key_items}</details>
+            ''')
+
+        st.markdown(''.join(week_html), unsafe_allow_html=True)
 
         if show_payout:
             st.markdown("---")
@@ -6,17 +6,14 @@ Rectified version for Streamlit Cloud, based on the working local script.
 
 import time
 import argparse
-import pandas as pd
+from functools import lru_cache
 from datetime import datetime, timedelta
 import pytz
 import csv
-import sys
 
 # It's crucial that webdriver-manager is listed in your requirements.txt
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import NoSuchElementException
 
 # Using the consistent mapping from your more detailed script
@@ -31,8 +28,16 @@ ALLOWED_ELEMENT_TYPES = {
     "calendar__cell calendar__previous": "previous"
 }
 
+@lru_cache(maxsize=1)
+def chromedriver_path():
+    """Resolve (and download if needed) chromedriver once per process."""
+    # Only needed to build the driver, so importing ffscraper doesn't pay for webdriver-manager
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
 def init_driver() -> webdriver.Chrome:
     """Initialize a lightweight Chrome WebDriver based on the working local script."""
+    from selenium.webdriver.chrome.service import Service
     print("Initializing WebDriver...")
     options = webdriver.ChromeOptions()
     # Using the same simple and effective options as the working local script
@@ -47,7 +52,7 @@ def init_driver() -> webdriver.Chrome:
 
     try:
         # Using webdriver-manager is more reliable across different environments
-        service = Service(ChromeDriverManager().install())
+        service = Service(chromedriver_path())
         driver = webdriver.Chrome(service=service, options=options)
         print("WebDriver initialized successfully.")
         return driver
@@ -208,33 +213,53 @@ def save_to_csv(events, filename):
         writer.writerows(events)
     print(f"Data saved successfully to {filename}")
 
-def main():
-    """Main function to run the scraper."""
-    parser = argparse.ArgumentParser(description="Scrape Forex Factory calendar.")
-    parser.add_argument("--month", type=str, help="Target month (e.g. June, July). Defaults to current month.")
-    parser.add_argument("--week", action="store_true", help="Only scrape current trading week (Mon-Fri).")
-    parser.add_argument("--output", default="latest_forex_data.csv", help="Output CSV filename.")
-    args = parser.parse_args()
-
-    # Determine URL parameter based on arguments
-    url_param = "this" if not args.month else args.month.lower()
-    if args.week and not args.month:
+def build_calendar_url(month=None, week_only=False):
+    """Calendar URL for the requested month, following the trading week across month ends."""
+    url_param = "this" if not month else month.lower()
+    if week_only and not month:
         today = datetime.now()
         week_start, _ = get_current_week_range()
         # If it's the weekend and the week starts next month, navigate to that month
         if today.month != week_start.month:
             url_param = week_start.strftime("%b").lower() # e.g., 'aug'
+    return f"https://www.forexfactory.com/calendar?month={url_param}"
 
-    url = f"https://www.forexfactory.com/calendar?month={url_param}"
+def scrape(month=None, week_only=False, progress=lambda message: None):
+    """Scrape the calendar and return the event rows; errors propagate to the caller.
+
+    progress is called with a short message at each stage so callers can show live status;
+    the stages already print to stdout, so the CLI leaves it as a no-op.
+    """
+    url = build_calendar_url(month, week_only)
     print(f"Scraping URL: {url}")
+    progress(f"Scraping URL: {url}")
 
-    driver = None
+    progress("Starting Chrome...")
+    driver = init_driver()
     try:
-        driver = init_driver()
+        progress("Loading calendar page...")
         driver.get(url)
+        progress("Scrolling to load all events...")
         scroll_to_end(driver)
-        events = parse_table(driver, week_filter=args.week)
-        
+        progress("Parsing calendar table...")
+        events = parse_table(driver, week_filter=week_only)
+        progress(f"Found {len(events)} events.")
+        return events
+    finally:
+        driver.quit()
+        print("WebDriver closed successfully.")
+
+def main():
+    """Main function to run the scraper."""
+    parser = argparse.ArgumentParser(description="Scrape Forex Factory calendar.")
+    parser.add_argument("--month", type=str, help="Target month (e.g. June, July). Defaults to current month.")
+    parser.add_argument("--week", action="store_true", help="Only scrape current trading week (Mon-Fri).")
+    parser.add_argument("--output", default="latest_forex_data.csv", help="Output CSV filename.")
+    args = parser.parse_args()
+
+    try:
+        events = scrape(args.month, args.week)
+
         if events:
             save_to_csv(events, args.output)
             print("\n=== Scraping completed successfully ===")
@@ -245,11 +270,6 @@ def main():
         print("\nScraping interrupted by user.")
     except Exception as e:
         print(f"\nAn unrecoverable error occurred: {str(e)}")
-        # In case of error, the driver quit might be skipped, so ensure it happens
-    finally:
-        if driver:
-            driver.quit()
-            print("WebDriver closed successfully.")
 
 if __name__ == "__main__":
     main()